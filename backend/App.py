@@ -1,21 +1,103 @@
 import os
+from functools import partial
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import check_password_hash, generate_password_hash
+from rate_limit import limitar, metricas_texto, client_ip, TRUSTED_PROXY_HOPS
+import jobs
+import replica
+from circuit_breaker import CircuitBreaker, DB_PROBE_TIMEOUT
+from columnar import responder_lista
+import tenants
 
 app = Flask(__name__)
 CORS(app)
+if TRUSTED_PROXY_HOPS:
+    # remote_addr passa a ser o hop mais à direita adicionado pelos proxies confiáveis
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
+DB_SSLMODE = os.environ.get('DB_SSLMODE', 'require')
+
+def get_db_connection(leitura=False):
+    # Conexão do pool do condomínio da requisição (ver tenants.py)
+    # leitura=True: pode ir para a réplica (ver replica.py), se houver uma saudável
+    tenant = g.tenant
+    banco_padrao = tenants.usa_banco_padrao(tenant)
+    if leitura and banco_padrao:
+        conn = replica.conectar_leitura(tenant, f'{tenant}:{client_ip()}')
+        if conn:
+            return conn
+    try:
+        return tenants.conectar(tenant)
+    except psycopg2.OperationalError:
+        # Só o breaker do banco deste tenant; os outros bancos não são afetados
+        breaker = breaker_do_tenant(tenant)
+        if breaker:
+            breaker.registrar_falha()
+        raise
+
+
+def sonda_banco(dsn):
+    conn = psycopg2.connect(dsn, sslmode=DB_SSLMODE, connect_timeout=DB_PROBE_TIMEOUT)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    finally:
+        conn.close()
+
 
-DATABASE_URL = os.environ.get('DATABASE_URL')
+# Um breaker (e um monitor) por banco distinto; tenants no mesmo DSN compartilham o mesmo.
+# Tenant sem DSN (nem DATABASE_URL) não tem o que monitorar.
+db_breakers = {dsn: CircuitBreaker() for dsn in {cfg['dsn'] for cfg in tenants.TENANTS.values()} if dsn}
 
-def get_db_connection():
-    return psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor, sslmode='require', connect_timeout=10)
+
+def breaker_do_tenant(slug):
+    return db_breakers.get(tenants.config(slug)['dsn'])
+
+# Rotas que respondem mesmo com o banco fora do ar
+ROTAS_SEM_BANCO = ('db_status', 'metrics')
+
+
+@app.before_request
+def resolver_tenant():
+    try:
+        # ProxyFix reescreve remote_addr; o X-Tenant só vale se a conexão direta for de um proxy confiável
+        origem = request.environ.get('werkzeug.proxy_fix.orig', {}).get('REMOTE_ADDR', request.remote_addr)
+        g.tenant = tenants.resolver(request.headers, request.host, origem)
+    except tenants.TenantNaoEncontrado:
+        g.tenant = None
+        if request.method != 'OPTIONS' and request.endpoint not in ROTAS_SEM_BANCO:
+            return jsonify({'error': 'Condomínio não encontrado.'}), 404
+    return None
+
+
+@app.before_request
+def verificar_banco():
+    for dsn, breaker in db_breakers.items():
+        breaker.iniciar_monitor(partial(sonda_banco, dsn))
+    if request.method == 'OPTIONS' or request.endpoint in ROTAS_SEM_BANCO:
+        return None
+    breaker = breaker_do_tenant(g.tenant)
+    if breaker and not breaker.permitir():
+        resp = jsonify({'error': 'Banco de dados indisponível. Tente novamente em instantes.'})
+        resp.headers['Retry-After'] = str(breaker.retry_after())
+        return resp, 503
+    return None
+
+
+@app.after_request
+def registrar_escrita(response):
+    # Leituras seguintes do mesmo cliente vão ao primário (read-your-own-write)
+    if request.method in ('POST', 'PUT', 'DELETE') and response.status_code < 400:
+        replica.marcar_escrita(f"{g.get('tenant')}:{client_ip()}")
+    return response
 
 
 # --- CADASTRO ---
 @app.route('/api/register', methods=['POST'])
+@limitar('register')
 def register():
     data = request.get_json()
     nome = data.get('nome')
@@ -68,6 +150,7 @@ def register():
 
 # --- LOGIN ---
 @app.route('/api/login', methods=['POST'])
+@limitar('login')
 def login():
     data = request.get_json()
     conn = None
@@ -105,6 +188,7 @@ def login():
 
 # --- ALTERAR SENHA ---
 @app.route('/api/moradores/<int:morador_id>/senha', methods=['PUT'])
+@limitar('senha')
 def change_password(morador_id):
     data = request.get_json()
     senha_atual = data.get('senha_atual')
@@ -243,7 +327,8 @@ def delete_morador(morador_id):
             if not admin_bloco or not target_bloco or admin_bloco['bloco_id'] != target_bloco['bloco_id']:
                 return jsonify({'error': 'Você só pode excluir moradores do seu bloco.'}), 403
 
-        cursor.execute('DELETE FROM moradores WHERE morador_id = %s', (morador_id,))
+        # Remove também vínculos, solicitações e reclamações (o schema não tem ON DELETE CASCADE)
+        jobs.excluir_moradores(cursor, [morador_id])
         conn.commit()
         return jsonify({'message': 'Morador excluído com sucesso.'}), 200
     except Exception as e:
@@ -309,7 +394,7 @@ def get_my_requests():
     morador_id = request.args.get('morador_id')
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(leitura=True)
         cursor = conn.cursor()
         cursor.execute('''
             SELECT r.request_id, r.status, r.created_at,
@@ -337,7 +422,7 @@ def get_requests():
 
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(leitura=True)
         cursor = conn.cursor()
 
         query = '''
@@ -421,7 +506,7 @@ def handle_request(request_id):
 def manage_complaints():
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(leitura=request.method == 'GET')
         cursor = conn.cursor()
 
         if request.method == 'POST':
@@ -436,6 +521,8 @@ def manage_complaints():
 
         user_id = request.args.get('user_id')
         role = request.args.get('role')
+        # Por padrão só lê a partição quente; o histórico arquivado é opt-in
+        include_archived = request.args.get('include_archived', '').lower() in ('1', 'true')
 
         # FIX: JOIN direto pelo apartamento_id da reclamação + DISTINCT ON para eliminar duplicatas
         # Para reclamações antigas (apartamento_id NULL), faz fallback via morador_apartamentos
@@ -454,6 +541,8 @@ def manage_complaints():
             LEFT JOIN apartamentos  a_fallback ON ma.apartamento_id = a_fallback.apartamento_id
             LEFT JOIN blocos        b_fallback ON a_fallback.bloco_id = b_fallback.bloco_id
         '''
+        if not include_archived:
+            query_admin += ' WHERE c.arquivada = FALSE'
 
         if role == 'sindico':
             cursor.execute(query_admin + ' ORDER BY c.id DESC')
@@ -466,25 +555,25 @@ def manage_complaints():
             ''', (user_id,))
             res = cursor.fetchone()
             if not res:
-                return jsonify([]), 200
+                return responder_lista([]), 200
             # Filtra pelo bloco da reclamação (direto ou fallback)
             cursor.execute(query_admin + '''
                 ORDER BY c.id DESC
             ''')
             # Filtra em Python para garantir compatibilidade com NULL
             all_rows = cursor.fetchall()
-            return jsonify([r for r in all_rows if r.get('bloco_id') == res['bloco_id']]), 200
+            return responder_lista([r for r in all_rows if r.get('bloco_id') == res['bloco_id']]), 200
 
         else:
             # Morador: só as próprias reclamações, sem duplicata
             cursor.execute('''
                 SELECT DISTINCT ON (c.id) c.*
                 FROM complaints c
-                WHERE c.user_id = %s
+                WHERE c.user_id = %s AND (%s OR c.arquivada = FALSE)
                 ORDER BY c.id DESC
-            ''', (user_id,))
+            ''', (user_id, include_archived))
 
-        return jsonify(cursor.fetchall()), 200
+        return responder_lista(cursor.fetchall()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -499,9 +588,10 @@ def update_complaint(complaint_id):
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            UPDATE complaints SET status = %s, admin_comment = %s
+            UPDATE complaints SET status = %s, admin_comment = %s,
+                   arquivada = arquivada AND %s IS NOT DISTINCT FROM 'Resolvido'
             WHERE id = %s RETURNING *
-        ''', (data.get('status'), data.get('admin_comment'), complaint_id))
+        ''', (data.get('status'), data.get('admin_comment'), data.get('status'), complaint_id))
         conn.commit()
         return jsonify(cursor.fetchone()), 200
     except Exception as e:
@@ -511,10 +601,54 @@ def update_complaint(complaint_id):
         if conn: conn.close()
 
 
+# --- TAREFAS EM SEGUNDO PLANO (executadas pelo worker.py) ---
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    data = request.get_json()
+    if data.get('requester_role') != 'sindico':
+        return jsonify({'error': 'Apenas o Síndico Geral pode criar tarefas.'}), 403
+
+    tipo = data.get('tipo')
+    if tipo not in jobs.HANDLERS:
+        return jsonify({'error': 'Tipo de tarefa inválido.'}), 400
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        job = jobs.enfileirar(cursor, tipo, data.get('payload') or {}, data.get('requester_id'))
+        conn.commit()
+        return jsonify(job), 202
+    except Exception as e:
+        if conn: conn.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn: conn.close()
+
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def job_status(job_id):
+    if request.args.get('role') != 'sindico':
+        return jsonify({'error': 'Acesso negado.'}), 403
+
+    conn = None
+    try:
+        conn = get_db_connection(leitura=True)
+        cursor = conn.cursor()
+        job = jobs.buscar(cursor, job_id)
+        if not job:
+            return jsonify({'error': 'Tarefa não encontrada.'}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        if conn: conn.close()
+
+
 # --- ROTAS AUXILIARES ---
 @app.route('/api/blocks', methods=['GET'])
 def get_blocks():
-    conn = get_db_connection()
+    conn = get_db_connection(leitura=True)
     cursor = conn.cursor()
     cursor.execute('SELECT bloco_id, numero_bloco FROM blocos ORDER BY numero_bloco')
     res = cursor.fetchall()
@@ -523,7 +657,7 @@ def get_blocks():
 
 @app.route('/api/blocks/<int:num>/apartments', methods=['GET'])
 def get_apts(num):
-    conn = get_db_connection()
+    conn = get_db_connection(leitura=True)
     cursor = conn.cursor()
     cursor.execute('''
         SELECT a.numero_apartamento FROM apartamentos a
@@ -536,12 +670,35 @@ def get_apts(num):
 
 @app.route('/api/db-status', methods=['GET'])
 def db_status():
-    try:
-        conn = get_db_connection()
-        conn.close()
-        return jsonify({'status': 'online'}), 200
-    except:
-        return jsonify({'status': 'offline'}), 500
+    # Não abre conexão: reporta o que o monitor de saúde mediu por último (do banco do condomínio)
+    breaker = breaker_do_tenant(g.tenant) if g.tenant else None
+    if breaker is None:
+        return jsonify({'status': 'offline', 'breaker': None, 'replica': replica.status()}), 503
+    estado = breaker.status()
+    online = estado['estado'] != 'open'
+    body = {'status': 'online' if online else 'offline', 'breaker': estado, 'replica': replica.status()}
+    if online:
+        return jsonify(body), 200
+    resp = jsonify(body)
+    resp.headers['Retry-After'] = str(breaker.retry_after())
+    return resp, 503
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    # Uma série por tenant (o DSN tem senha e não pode virar label)
+    estados = {'closed': 0, 'half_open': 1, 'open': 2}
+    circuito, latencia = ['# TYPE db_circuit_state gauge'], ['# TYPE db_probe_latency_seconds gauge']
+    for slug in tenants.listar():
+        breaker = breaker_do_tenant(slug)
+        if breaker is None:
+            continue
+        estado = breaker.status()
+        circuito.append(f'db_circuit_state{{tenant="{slug}"}} {estados[estado["estado"]]}')
+        if estado['latencia_ms'] is not None:
+            latencia.append(f'db_probe_latency_seconds{{tenant="{slug}"}} {estado["latencia_ms"] / 1000}')
+    linhas = circuito + (latencia if len(latencia) > 1 else [])
+    return Response(metricas_texto() + '\n'.join(linhas) + '\n', mimetype='text/plain; version=0.0.4')
 
 
 # --- LISTA DE USUÁRIOS ---
@@ -552,7 +709,7 @@ def list_users():
     role = request.args.get('role')
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(leitura=True)
         cursor = conn.cursor()
         # DISTINCT ON (m.morador_id) — pega apenas 1 linha por morador
         query_base = '''
@@ -581,7 +738,7 @@ def list_users():
             )
         else:
             return jsonify({'error': 'Acesso negado'}), 403
-        return jsonify(cursor.fetchall()), 200
+        return responder_lista(cursor.fetchall()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     finally:
@@ -0,0 +1,307 @@
+"""
+CLI administrativa para alterações em lote nos moradores.
+
+Substitui set_sindico.py, tornar_master.py e set_block_admin.py. Cada
+execução aplica o lote inteiro numa única transação: se qualquer e-mail
+for inválido ou alguma regra for violada, nada é gravado.
+
+O lote roda duas vezes: uma prévia (validação + resultado, sempre desfeita)
+antes da confirmação, e a aplicação depois dela. Nenhuma transação ou lock
+fica aberto enquanto o terminal espera a resposta; se o banco mudou entre
+a prévia e a aplicação, nada é gravado.
+
+Exemplos:
+    python admin.py promote --role admin_bloco ana@x.com bruno@x.com
+    python admin.py promote --role sindico admin@condominio.com
+    python admin.py demote --csv ex_sindicos.csv
+    python admin.py link --bloco 3 --apartamento 42 carla@x.com
+    python admin.py link --csv vinculos.csv          # colunas: email,bloco,apartamento
+    python admin.py unlink carla@x.com               # remove todos os vínculos
+    python admin.py delete --dry-run --csv mudancas.csv
+
+--dry-run só mostra a prévia; --yes pula a confirmação;
+--tenant escolhe o condomínio numa instalação com vários (ver tenants.py).
+"""
+import argparse
+import csv
+import os
+import sys
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+import jobs
+import tenants
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+DB_SSLMODE = os.environ.get('DB_SSLMODE', 'require')
+
+
+class LoteInvalido(Exception):
+    pass
+
+
+def ler_entradas(args, com_apartamento=False):
+    """Junta e-mails da linha de comando e do CSV em [{'email', 'bloco', 'apartamento'}]."""
+    entradas = [{'email': e.strip(), 'bloco': args.bloco, 'apartamento': args.apartamento}
+                for e in args.emails]
+    if args.csv:
+        with open(args.csv, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                entradas.append({
+                    'email': (row.get('email') or '').strip(),
+                    'bloco': row.get('bloco') or args.bloco,
+                    'apartamento': row.get('apartamento') or args.apartamento,
+                })
+    entradas = [e for e in entradas if e['email']]
+    if not entradas:
+        raise LoteInvalido("Nenhum e-mail informado.")
+
+    if com_apartamento:
+        for e in entradas:
+            try:
+                e['bloco'] = int(''.join(filter(str.isdigit, str(e['bloco']))))
+                e['apartamento'] = int(''.join(filter(str.isdigit, str(e['apartamento']))))
+            except ValueError:
+                raise LoteInvalido(f"Bloco/apto inválidos para {e['email']}.")
+    return entradas
+
+
+def buscar_moradores(cursor, emails):
+    cursor.execute(
+        'SELECT morador_id, nome, email, role FROM moradores WHERE email = ANY(%s) ORDER BY email',
+        (list(set(emails)),)
+    )
+    moradores = cursor.fetchall()
+    faltando = set(emails) - {m['email'] for m in moradores}
+    if faltando:
+        raise LoteInvalido("Moradores não encontrados: " + ', '.join(sorted(faltando)))
+    return moradores
+
+
+def validar_admin_bloco(cursor, ids):
+    """Mesma regra do change_role: só 1 admin_bloco por bloco."""
+    cursor.execute('''
+        SELECT DISTINCT ON (m.morador_id) m.morador_id, m.email, b.bloco_id, b.numero_bloco
+        FROM moradores m
+        LEFT JOIN morador_apartamentos ma ON m.morador_id = ma.morador_id
+        LEFT JOIN apartamentos a ON ma.apartamento_id = a.apartamento_id
+        LEFT JOIN blocos b ON a.bloco_id = b.bloco_id
+        WHERE m.morador_id = ANY(%s)
+        ORDER BY m.morador_id, b.numero_bloco
+    ''', (ids,))
+    alvos = cursor.fetchall()
+
+    sem_bloco = [a['email'] for a in alvos if a['bloco_id'] is None]
+    if sem_bloco:
+        raise LoteInvalido("Sem apartamento vinculado: " + ', '.join(sem_bloco))
+
+    por_bloco = {}
+    for a in alvos:
+        por_bloco.setdefault(a['numero_bloco'], []).append(a['email'])
+    repetidos = {b: e for b, e in por_bloco.items() if len(e) > 1}
+    if repetidos:
+        raise LoteInvalido('; '.join(
+            f"Bloco {b} receberia mais de um Síndico de Bloco ({', '.join(e)})" for b, e in repetidos.items()
+        ))
+
+    cursor.execute('''
+        SELECT DISTINCT b.numero_bloco, m.nome FROM moradores m
+        JOIN morador_apartamentos ma ON m.morador_id = ma.morador_id
+        JOIN apartamentos a ON ma.apartamento_id = a.apartamento_id
+        JOIN blocos b ON a.bloco_id = b.bloco_id
+        WHERE a.bloco_id = ANY(%s) AND m.role = 'admin_bloco' AND m.morador_id <> ALL(%s)
+        ORDER BY b.numero_bloco
+    ''', ([a['bloco_id'] for a in alvos], ids))
+    existentes = cursor.fetchall()
+    if existentes:
+        raise LoteInvalido('; '.join(
+            f"O Bloco {e['numero_bloco']} já possui um Síndico de Bloco ({e['nome']})" for e in existentes
+        ))
+
+
+def cmd_promote(cursor, args):
+    moradores = buscar_moradores(cursor, [e['email'] for e in ler_entradas(args)])
+    ids = [m['morador_id'] for m in moradores]
+    if args.role == 'admin_bloco':
+        if args.aplicar:
+            # Evita que outra promoção concorrente fure a regra durante a validação
+            cursor.execute('LOCK TABLE moradores IN SHARE ROW EXCLUSIVE MODE')
+        validar_admin_bloco(cursor, ids)
+    cursor.execute('UPDATE moradores SET role = %s WHERE morador_id = ANY(%s)', (args.role, ids))
+    return [f"{m['nome']} <{m['email']}>: {m['role']} -> {args.role}" for m in moradores]
+
+
+def cmd_demote(cursor, args):
+    moradores = buscar_moradores(cursor, [e['email'] for e in ler_entradas(args)])
+    ids = [m['morador_id'] for m in moradores]
+    cursor.execute("UPDATE moradores SET role = 'morador' WHERE morador_id = ANY(%s)", (ids,))
+    return [f"{m['nome']} <{m['email']}>: {m['role']} -> morador" for m in moradores]
+
+
+def _resolver_vinculos(cursor, entradas):
+    buscar_moradores(cursor, [e['email'] for e in entradas])
+    cursor.execute('''
+        SELECT t.email, t.bloco, t.apartamento, m.morador_id, a.apartamento_id
+        FROM unnest(%s::text[], %s::int[], %s::int[]) AS t(email, bloco, apartamento)
+        JOIN moradores m ON m.email = t.email
+        LEFT JOIN blocos b ON b.numero_bloco = t.bloco
+        LEFT JOIN apartamentos a ON a.bloco_id = b.bloco_id AND a.numero_apartamento = t.apartamento
+    ''', ([e['email'] for e in entradas], [e['bloco'] for e in entradas], [e['apartamento'] for e in entradas]))
+    vinculos = cursor.fetchall()
+    invalidos = [f"{v['email']} (Bloco {v['bloco']} Ap {v['apartamento']})" for v in vinculos if v['apartamento_id'] is None]
+    if invalidos:
+        raise LoteInvalido("Apartamento não encontrado: " + ', '.join(invalidos))
+    return vinculos
+
+
+def cmd_link(cursor, args):
+    vinculos = _resolver_vinculos(cursor, ler_entradas(args, com_apartamento=True))
+    cursor.execute('''
+        INSERT INTO morador_apartamentos (morador_id, apartamento_id)
+        SELECT DISTINCT t.morador_id, t.apartamento_id
+        FROM unnest(%s::int[], %s::int[]) AS t(morador_id, apartamento_id)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM morador_apartamentos ma
+            WHERE ma.morador_id = t.morador_id AND ma.apartamento_id = t.apartamento_id
+        )
+    ''', ([v['morador_id'] for v in vinculos], [v['apartamento_id'] for v in vinculos]))
+    return [f"{cursor.rowcount} vínculo(s) criado(s)."] + \
+           [f"{v['email']} -> Bloco {v['bloco']} Ap {v['apartamento']}" for v in vinculos]
+
+
+def cmd_unlink(cursor, args):
+    if args.bloco is None and args.apartamento is None and not args.csv:
+        moradores = buscar_moradores(cursor, [e['email'] for e in ler_entradas(args)])
+        cursor.execute(
+            'DELETE FROM morador_apartamentos WHERE morador_id = ANY(%s)',
+            ([m['morador_id'] for m in moradores],)
+        )
+        return [f"{cursor.rowcount} vínculo(s) removido(s)."] + \
+               [f"{m['email']}: todos os apartamentos" for m in moradores]
+
+    vinculos = _resolver_vinculos(cursor, ler_entradas(args, com_apartamento=True))
+    cursor.execute('''
+        DELETE FROM morador_apartamentos ma
+        USING unnest(%s::int[], %s::int[]) AS t(morador_id, apartamento_id)
+        WHERE ma.morador_id = t.morador_id AND ma.apartamento_id = t.apartamento_id
+    ''', ([v['morador_id'] for v in vinculos], [v['apartamento_id'] for v in vinculos]))
+    return [f"{cursor.rowcount} vínculo(s) removido(s)."] + \
+           [f"{v['email']} -x Bloco {v['bloco']} Ap {v['apartamento']}" for v in vinculos]
+
+
+def cmd_delete(cursor, args):
+    moradores = buscar_moradores(cursor, [e['email'] for e in ler_entradas(args)])
+    n = jobs.excluir_moradores(cursor, [m['morador_id'] for m in moradores])
+    return [f"{n} morador(es) excluído(s)."] + [f"{m['nome']} <{m['email']}>" for m in moradores]
+
+
+COMANDOS = {
+    'promote': cmd_promote,
+    'demote': cmd_demote,
+    'link': cmd_link,
+    'unlink': cmd_unlink,
+    'delete': cmd_delete,
+}
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(description="Alterações em lote nos moradores do condomínio.")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    for nome, ajuda in (
+        ('promote', 'Altera o cargo para admin_bloco ou sindico'),
+        ('demote', "Volta o cargo para 'morador'"),
+        ('link', 'Vincula moradores a apartamentos'),
+        ('unlink', 'Remove vínculos de apartamentos'),
+        ('delete', 'Exclui moradores e seus dados'),
+    ):
+        p = sub.add_parser(nome, help=ajuda)
+        p.add_argument('emails', nargs='*', help='E-mails dos moradores')
+        p.add_argument('--csv', help='Arquivo CSV com coluna email (e bloco,apartamento para link/unlink)')
+        p.add_argument('--dry-run', action='store_true', help='Mostra o resultado sem gravar')
+        p.add_argument('--yes', '-y', action='store_true', help='Não pede confirmação')
+        p.add_argument('--tenant', help='Condomínio (ver tenants.py); padrão: DATABASE_URL')
+        if nome == 'promote':
+            p.add_argument('--role', required=True, choices=('admin_bloco', 'sindico'))
+        if nome in ('link', 'unlink'):
+            p.add_argument('--bloco')
+            p.add_argument('--apartamento')
+        else:
+            p.set_defaults(bloco=None, apartamento=None)
+    return parser
+
+
+def executar(conn, args, aplicar):
+    """Roda o comando numa transação; sem `aplicar`, desfaz tudo no final (prévia)."""
+    args.aplicar = aplicar
+    try:
+        with conn.cursor() as cursor:
+            linhas = COMANDOS[args.comando](cursor, args)
+    except Exception:
+        conn.rollback()
+        raise
+    if not aplicar:
+        conn.rollback()
+    return linhas
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    try:
+        dsn = tenants.config(args.tenant)['dsn'] if args.tenant else DATABASE_URL
+    except tenants.TenantNaoEncontrado as e:
+        print(f"Erro: condomínio {e} não configurado.")
+        return 1
+    if not dsn:
+        print("Erro: Variável de ambiente DATABASE_URL não foi definida." if not args.tenant
+              else f"Erro: condomínio {args.tenant} sem dsn e DATABASE_URL não definida.")
+        return 1
+
+    conn = None
+    try:
+        if args.tenant:
+            conn = jobs.get_connection(args.tenant)
+        else:
+            conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor, sslmode=DB_SSLMODE, connect_timeout=10)
+        previa = executar(conn, args, aplicar=False)
+
+        print('\n'.join(previa))
+        if args.dry_run:
+            print("\n[dry-run] Nenhuma alteração foi gravada.")
+            return 0
+
+        if not args.yes and input("\nConfirmar as alterações acima? (s/n): ").lower() != 's':
+            print("Operação cancelada.")
+            return 0
+
+        linhas = executar(conn, args, aplicar=True)
+        if linhas != previa:
+            conn.rollback()
+            print("Erro: os dados mudaram desde a prévia:\n" + '\n'.join(linhas) +
+                  "\nNenhuma alteração foi gravada. Execute novamente.")
+            return 1
+        conn.commit()
+        print("Sucesso! Alterações gravadas.")
+        return 0
+    except LoteInvalido as e:
+        if conn: conn.rollback()
+        print(f"Erro: {e}\nNenhuma alteração foi gravada.")
+        return 1
+    except tenants.TenantNaoEncontrado as e:
+        print(f"Erro: condomínio {e} não configurado.")
+        return 1
+    except tenants.SchemaNaoProvisionado as e:
+        print(f"Erro: schema {e} não provisionado (rode setup_database.py {args.tenant}).")
+        return 1
+    except (psycopg2.Error, OSError) as e:
+        if conn: conn.rollback()
+        print(f"Ocorreu um erro: {e}")
+        return 1
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
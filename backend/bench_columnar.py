@@ -0,0 +1,88 @@
+"""
+Compara tamanho e tempo de serialização do formato atual (lista de objetos)
+com o formato colunar, com e sem gzip, usando dados sintéticos no formato
+de /api/complaints e /api/users. Não precisa de banco.
+
+Uso:
+    python bench_columnar.py [linhas]
+"""
+import gzip
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from columnar import para_colunas, COMPRESSAO_NIVEL
+
+STATUS = ('Pendente', 'Em Análise', 'Resolvido')
+ASSUNTOS = ('Barulho', 'Vazamento', 'Garagem', 'Limpeza', 'Elevador', 'Portaria')
+
+
+def reclamacoes(n):
+    inicio = datetime(2023, 1, 1)
+    rows = []
+    for i in range(n, 0, -1):
+        bloco = random.randint(1, 40)
+        rows.append({
+            'id': i,
+            'user_id': random.randint(1, 2000),
+            'apartamento_id': random.randint(1, 2881),
+            'subject': random.choice(ASSUNTOS),
+            'description': 'Descrição da reclamação número %d.' % i,
+            'status': random.choice(STATUS),
+            'admin_comment': None,
+            'created_at': inicio + timedelta(minutes=37 * i),
+            'arquivada': False,
+            'morador_nome': 'Morador %d' % random.randint(1, 2000),
+            'numero_apartamento': random.randint(1, 12) * 10 + random.randint(1, 6),
+            'numero_bloco': bloco,
+            'bloco_id': bloco + 1,
+        })
+    return rows
+
+
+def usuarios(n):
+    rows = []
+    for i in range(1, n + 1):
+        bloco = random.randint(1, 40)
+        rows.append({
+            'morador_id': i,
+            'nome': 'Morador %d' % i,
+            'email': 'morador%d@condominio.com' % i,
+            'role': 'admin_bloco' if i % 50 == 0 else 'morador',
+            'numero_apartamento': random.randint(1, 12) * 10 + random.randint(1, 6),
+            'numero_bloco': bloco,
+            'bloco_id': bloco + 1,
+        })
+    return rows
+
+
+def medir(rows, repeticoes=20):
+    resultados = {}
+    for nome, converter in (('objetos', lambda r: r), ('colunar', para_colunas)):
+        t0 = time.perf_counter()
+        for _ in range(repeticoes):
+            corpo = json.dumps(converter(rows), default=str).encode()
+        t_json = (time.perf_counter() - t0) / repeticoes
+
+        t0 = time.perf_counter()
+        for _ in range(repeticoes):
+            comprimido = gzip.compress(corpo, compresslevel=COMPRESSAO_NIVEL)
+        t_gzip = (time.perf_counter() - t0) / repeticoes
+
+        resultados[nome] = (len(corpo), len(comprimido), t_json * 1000, t_gzip * 1000)
+    return resultados
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    random.seed(42)
+    print(f"{'lista':<14}{'formato':<10}{'bytes':>10}{'gzip':>10}{'encode ms':>11}{'gzip ms':>9}")
+    for nome, rows in (('complaints', reclamacoes(n)), ('users', usuarios(n))):
+        for formato, (tam, tam_gz, t_json, t_gzip) in medir(rows).items():
+            print(f"{nome:<14}{formato:<10}{tam:>10}{tam_gz:>10}{t_json:>11.2f}{t_gzip:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
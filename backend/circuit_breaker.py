@@ -0,0 +1,108 @@
+"""
+Circuit breaker para a conexão com o banco principal.
+
+Um monitor em segundo plano testa o banco a cada DB_PROBE_INTERVAL segundos
+com timeout curto. Depois de DB_BREAKER_FALHAS falhas seguidas (do monitor
+ou de conexões reais das rotas) o circuito abre e as rotas respondem 503 na
+hora, sem segurar o worker no connect_timeout. Passados DB_BREAKER_ABERTO
+segundos o circuito fica semi-aberto: o próximo teste do monitor decide
+se fecha ou se volta a abrir. Só ele testa o banco no semi-aberto; as rotas
+continuam recebendo 503 até o circuito fechar.
+"""
+import os
+import threading
+import time
+
+FECHADO, ABERTO, SEMI_ABERTO = 'closed', 'open', 'half_open'
+
+DB_BREAKER_FALHAS = int(os.environ.get('DB_BREAKER_FALHAS', 3))
+DB_BREAKER_ABERTO = float(os.environ.get('DB_BREAKER_ABERTO', 15))
+DB_PROBE_INTERVAL = float(os.environ.get('DB_PROBE_INTERVAL', 5))
+DB_PROBE_TIMEOUT = int(os.environ.get('DB_PROBE_TIMEOUT', 2))
+
+
+class CircuitBreaker:
+    def __init__(self, limite_falhas=DB_BREAKER_FALHAS, tempo_aberto=DB_BREAKER_ABERTO):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self._lock = threading.Lock()
+        self._estado = FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._latencia = None
+        self._verificado_em = None
+        self._monitor_pid = None
+
+    @property
+    def estado(self):
+        with self._lock:
+            self._atualizar()
+            return self._estado
+
+    def _atualizar(self):
+        if self._estado == ABERTO and time.time() - self._aberto_em >= self.tempo_aberto:
+            self._estado = SEMI_ABERTO
+
+    def permitir(self):
+        """True só com o circuito fechado; no semi-aberto quem testa é o monitor."""
+        return self.estado == FECHADO
+
+    def retry_after(self):
+        with self._lock:
+            restante = self.tempo_aberto - (time.time() - self._aberto_em)
+        return max(1, int(restante + 0.999))
+
+    def registrar_sucesso(self, latencia=None):
+        with self._lock:
+            self._estado = FECHADO
+            self._falhas = 0
+            if latencia is not None:
+                self._latencia = latencia
+                self._verificado_em = time.time()
+
+    def registrar_falha(self, sonda=False):
+        with self._lock:
+            self._atualizar()
+            self._falhas += 1
+            if sonda:
+                self._latencia = None
+                self._verificado_em = time.time()
+            if self._estado == SEMI_ABERTO or self._falhas >= self.limite_falhas:
+                self._estado = ABERTO
+                self._aberto_em = time.time()
+
+    def status(self):
+        with self._lock:
+            self._atualizar()
+            return {
+                'estado': self._estado,
+                'falhas_seguidas': self._falhas,
+                'latencia_ms': round(self._latencia * 1000, 1) if self._latencia is not None else None,
+                'ultima_verificacao': self._verificado_em,
+            }
+
+    def iniciar_monitor(self, sonda, intervalo=DB_PROBE_INTERVAL):
+        """
+        Inicia (uma vez por processo) a thread que chama `sonda()` periodicamente.
+        Checa o pid porque threads não sobrevivem ao fork dos workers do gunicorn.
+        """
+        with self._lock:
+            if self._monitor_pid == os.getpid():
+                return
+            self._monitor_pid = os.getpid()
+
+        def loop():
+            while True:
+                # Aberto: espera o tempo de resfriamento; o teste seguinte é o do semi-aberto
+                if self.estado == ABERTO:
+                    time.sleep(min(intervalo, self.retry_after()))
+                    continue
+                inicio = time.perf_counter()
+                try:
+                    sonda()
+                    self.registrar_sucesso(time.perf_counter() - inicio)
+                except Exception:
+                    self.registrar_falha(sonda=True)
+                time.sleep(intervalo)
+
+        threading.Thread(target=loop, name='db-health-monitor', daemon=True).start()
@@ -0,0 +1,67 @@
+"""
+Formato colunar (opt-in) para as listas grandes da API.
+
+Com `?format=columnar` a resposta deixa de ser uma lista de objetos e passa a ser:
+    {
+      "format": "columnar",
+      "length": 3,
+      "columns": ["id", "status", ...],
+      "data": {"id": [3, 2, 1], "status": [0, 1, 0], ...},
+      "dictionaries": {"status": ["Pendente", "Resolvido"]}
+    }
+Colunas em `dictionaries` trazem índices no lugar dos valores
+(valor = dictionaries[col][data[col][i]]).
+
+Respostas acima de COMPRESSAO_MIN_BYTES são enviadas com gzip quando o
+cliente aceita, em qualquer um dos formatos.
+"""
+import gzip
+import os
+
+from flask import request, jsonify
+
+# Colunas de baixa cardinalidade que vale a pena codificar por dicionário
+COLUNAS_DICIONARIO = ('status', 'numero_bloco', 'bloco_id', 'role')
+COMPRESSAO_MIN_BYTES = int(os.environ.get('COMPRESSAO_MIN_BYTES', 2048))
+COMPRESSAO_NIVEL = int(os.environ.get('COMPRESSAO_NIVEL', 6))
+
+
+def para_colunas(rows, dicionario=COLUNAS_DICIONARIO):
+    colunas = list(rows[0].keys()) if rows else []
+    data, dicionarios = {}, {}
+    for col in colunas:
+        valores = [r[col] for r in rows]
+        if col in dicionario:
+            indices = {}
+            data[col] = [indices.setdefault(v, len(indices)) for v in valores]
+            dicionarios[col] = list(indices)
+        else:
+            data[col] = valores
+    return {
+        'format': 'columnar',
+        'length': len(rows),
+        'columns': colunas,
+        'data': data,
+        'dictionaries': dicionarios,
+    }
+
+
+def comprimir(resp):
+    """Aplica gzip se o corpo passar do limite e o cliente aceitar."""
+    # Vary em toda resposta: caches não podem servir a versão sem gzip para quem aceita, e vice-versa
+    resp.vary.add('Accept-Encoding')
+    if 'gzip' not in request.headers.get('Accept-Encoding', '').lower():
+        return resp
+    corpo = resp.get_data()
+    if len(corpo) < COMPRESSAO_MIN_BYTES:
+        return resp
+    resp.set_data(gzip.compress(corpo, compresslevel=COMPRESSAO_NIVEL))
+    resp.headers['Content-Encoding'] = 'gzip'
+    return resp
+
+
+def responder_lista(rows):
+    """jsonify para listas: respeita ?format=columnar e comprime respostas grandes."""
+    if request.args.get('format') == 'columnar':
+        return comprimir(jsonify(para_colunas(rows)))
+    return comprimir(jsonify(rows))
@@ -0,0 +1,280 @@
+"""
+Fila de tarefas administrativas em segundo plano, guardada na tabela `jobs`.
+
+A API só enfileira (enfileirar) e consulta o status; quem executa é o
+processo separado `worker.py`, que reserva tarefas com FOR UPDATE SKIP LOCKED.
+Falhas são repetidas com backoff exponencial até `max_tentativas`.
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.extras import RealDictCursor, Json
+from werkzeug.security import generate_password_hash
+
+import particionar_reclamacoes
+import tenants
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+DB_SSLMODE = os.environ.get('DB_SSLMODE', 'require')
+
+# Segundos de espera antes da 1ª repetição; dobra a cada nova falha
+BACKOFF_BASE = int(os.environ.get('JOB_BACKOFF_BASE', 10))
+# Enquanto executa, o worker renova heartbeat_em a cada JOB_HEARTBEAT segundos.
+# Tarefas 'Executando' sem heartbeat há JOB_TIMEOUT segundos são órfãs (worker morreu).
+HEARTBEAT_INTERVALO = int(os.environ.get('JOB_HEARTBEAT', 30))
+TIMEOUT_EXECUCAO = int(os.environ.get('JOB_TIMEOUT', 300))
+
+
+def get_connection(tenant=None):
+    """Conexão própria do worker; com `tenant`, no banco/schema daquele condomínio."""
+    if tenant is None:
+        return psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor, sslmode=DB_SSLMODE, connect_timeout=10)
+    dsn, schema = tenants.parametros_conexao(tenant)
+    conn = psycopg2.connect(dsn, cursor_factory=RealDictCursor, sslmode=DB_SSLMODE, connect_timeout=10)
+    try:
+        tenants.definir_schema(conn, schema)
+    except (psycopg2.Error, tenants.SchemaNaoProvisionado):
+        conn.close()
+        raise
+    return conn
+
+
+# --- OPERAÇÕES EM MASSA (usadas pelos handlers) ---
+
+def excluir_moradores(cursor, morador_ids):
+    """Remove moradores e tudo que depende deles. Retorna a quantidade excluída."""
+    ids = list(morador_ids)
+    cursor.execute('DELETE FROM complaints WHERE user_id = ANY(%s)', (ids,))
+    cursor.execute('DELETE FROM apartment_requests WHERE morador_id = ANY(%s)', (ids,))
+    cursor.execute('DELETE FROM morador_apartamentos WHERE morador_id = ANY(%s)', (ids,))
+    cursor.execute('DELETE FROM moradores WHERE morador_id = ANY(%s)', (ids,))
+    return cursor.rowcount
+
+
+def _importar_moradores(cursor, payload):
+    importados, erros = 0, []
+    for item in payload.get('moradores', []):
+        email = item.get('email')
+        if not email or not item.get('password'):
+            erros.append({'email': email, 'error': 'E-mail e senha são obrigatórios.'})
+            continue
+        try:
+            bloco_num = int(''.join(filter(str.isdigit, str(item.get('bloco')))))
+            ap_num = int(''.join(filter(str.isdigit, str(item.get('apartamento')))))
+        except ValueError:
+            erros.append({'email': email, 'error': 'Dados de bloco/apto inválidos.'})
+            continue
+
+        cursor.execute('''
+            SELECT a.apartamento_id FROM apartamentos a
+            JOIN blocos b ON a.bloco_id = b.bloco_id
+            WHERE b.numero_bloco = %s AND a.numero_apartamento = %s
+        ''', (bloco_num, ap_num))
+        res_ap = cursor.fetchone()
+        if not res_ap:
+            erros.append({'email': email, 'error': 'Apartamento não encontrado.'})
+            continue
+
+        # Mesma regra do /api/register: um morador cadastrado por apartamento
+        cursor.execute('SELECT morador_id FROM morador_apartamentos WHERE apartamento_id = %s', (res_ap['apartamento_id'],))
+        if cursor.fetchone():
+            erros.append({'email': email, 'error': 'Apartamento já possui morador cadastrado.'})
+            continue
+
+        cursor.execute('''
+            INSERT INTO moradores (nome, email, password, role)
+            VALUES (%s, %s, %s, 'morador')
+            ON CONFLICT (email) DO NOTHING RETURNING morador_id
+        ''', (item.get('nome'), email, generate_password_hash(item.get('password'))))
+        novo = cursor.fetchone()
+        if not novo:
+            erros.append({'email': email, 'error': 'E-mail já cadastrado.'})
+            continue
+
+        cursor.execute(
+            'INSERT INTO morador_apartamentos (morador_id, apartamento_id) VALUES (%s, %s)',
+            (novo['morador_id'], res_ap['apartamento_id'])
+        )
+        importados += 1
+    return {'importados': importados, 'erros': erros}
+
+
+def _exportar_moradores(cursor, payload):
+    cursor.execute('''
+        SELECT m.morador_id, m.nome, m.email, m.role,
+               a.numero_apartamento, b.numero_bloco
+        FROM moradores m
+        LEFT JOIN morador_apartamentos ma ON m.morador_id = ma.morador_id
+        LEFT JOIN apartamentos a ON ma.apartamento_id = a.apartamento_id
+        LEFT JOIN blocos b ON a.bloco_id = b.bloco_id
+        ORDER BY b.numero_bloco, a.numero_apartamento, m.nome
+    ''')
+    return {'moradores': cursor.fetchall()}
+
+
+def _excluir_moradores(cursor, payload):
+    return {'excluidos': excluir_moradores(cursor, payload.get('morador_ids', []))}
+
+
+def _arquivar_reclamacoes(cursor, payload):
+    dias = int(payload.get('dias', particionar_reclamacoes.ARQUIVO_DIAS))
+    with cursor.connection.cursor(cursor_factory=psycopg2.extensions.cursor) as c:
+        return {'arquivadas': particionar_reclamacoes.arquivar(c, dias)}
+
+
+# tipo -> (handler, máximo de execuções simultâneas em todos os workers)
+HANDLERS = {
+    'importar_moradores': (_importar_moradores, int(os.environ.get('JOB_LIMITE_IMPORTAR', 1))),
+    'exportar_moradores': (_exportar_moradores, int(os.environ.get('JOB_LIMITE_EXPORTAR', 2))),
+    'excluir_moradores': (_excluir_moradores, int(os.environ.get('JOB_LIMITE_EXCLUIR', 1))),
+    'arquivar_reclamacoes': (_arquivar_reclamacoes, 1),
+}
+
+
+# --- FILA ---
+
+def enfileirar(cursor, tipo, payload, criado_por=None, max_tentativas=5):
+    cursor.execute('''
+        INSERT INTO jobs (tipo, payload, criado_por, max_tentativas)
+        VALUES (%s, %s, %s, %s) RETURNING job_id, tipo, status, created_at
+    ''', (tipo, Json(payload), criado_por, max_tentativas))
+    return cursor.fetchone()
+
+
+def buscar(cursor, job_id):
+    cursor.execute('''
+        SELECT job_id, tipo, status, tentativas, max_tentativas, resultado, erro,
+               created_at, iniciado_em, finalizado_em, executar_em
+        FROM jobs WHERE job_id = %s
+    ''', (job_id,))
+    return cursor.fetchone()
+
+
+def reservar(conn):
+    """Reserva a próxima tarefa pronta e a marca como 'Executando'. Retorna None se não houver."""
+    with conn.cursor() as cursor:
+        cursor.execute('''
+            SELECT tipo FROM jobs
+            WHERE status = 'Pendente' AND executar_em <= CURRENT_TIMESTAMP AND tipo = ANY(%s)
+            GROUP BY tipo ORDER BY MIN(executar_em)
+        ''', (list(HANDLERS),))
+        tipos = [r['tipo'] for r in cursor.fetchall()]
+    conn.commit()
+
+    for tipo in tipos:
+        _, limite = HANDLERS[tipo]
+        with conn.cursor() as cursor:
+            # Serializa contagem + reserva por tipo entre todos os workers;
+            # o lock é liberado no commit logo abaixo
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('jobs:' || %s))", (tipo,))
+            cursor.execute("SELECT COUNT(*) AS n FROM jobs WHERE status = 'Executando' AND tipo = %s", (tipo,))
+            job = None
+            if cursor.fetchone()['n'] < limite:
+                cursor.execute('''
+                    UPDATE jobs SET status = 'Executando', tentativas = tentativas + 1,
+                                    iniciado_em = CURRENT_TIMESTAMP, heartbeat_em = CURRENT_TIMESTAMP,
+                                    erro = NULL
+                    WHERE job_id = (
+                        SELECT job_id FROM jobs
+                        WHERE status = 'Pendente' AND executar_em <= CURRENT_TIMESTAMP AND tipo = %s
+                        ORDER BY executar_em, job_id
+                        FOR UPDATE SKIP LOCKED
+                        LIMIT 1
+                    )
+                    RETURNING *
+                ''', (tipo,))
+                job = cursor.fetchone()
+        conn.commit()
+        if job:
+            return job
+    return None
+
+
+@contextmanager
+def batimentos(conectar, job):
+    """
+    Renova heartbeat_em numa conexão própria enquanto o bloco executa,
+    para que recuperar_orfaos não devolva à fila uma tarefa ainda viva.
+    """
+    parar = threading.Event()
+
+    def loop():
+        conn = None
+        while not parar.wait(HEARTBEAT_INTERVALO):
+            try:
+                if conn is None or conn.closed:
+                    conn = conectar()
+                with conn.cursor() as cursor:
+                    cursor.execute('''
+                        UPDATE jobs SET heartbeat_em = CURRENT_TIMESTAMP
+                        WHERE job_id = %s AND status = 'Executando' AND iniciado_em = %s
+                    ''', (job['job_id'], job['iniciado_em']))
+                conn.commit()
+            except psycopg2.Error:
+                if conn: conn.close()
+                conn = None
+        if conn: conn.close()
+
+    t = threading.Thread(target=loop, daemon=True)
+    t.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        t.join()
+
+
+def executar(conn, job):
+    """Roda o handler e grava o resultado na mesma transação; em caso de erro agenda nova tentativa."""
+    handler, _ = HANDLERS[job['tipo']]
+    try:
+        with conn.cursor() as cursor:
+            resultado = handler(cursor, job['payload'] or {})
+            cursor.execute('''
+                UPDATE jobs SET status = 'Concluido', resultado = %s, finalizado_em = CURRENT_TIMESTAMP
+                WHERE job_id = %s AND status = 'Executando' AND iniciado_em = %s
+            ''', (Json(resultado, dumps=lambda o: json.dumps(o, default=str)), job['job_id'], job['iniciado_em']))
+            if cursor.rowcount == 0:
+                # Esta tentativa foi dada como órfã e devolvida à fila: descarta o trabalho
+                conn.rollback()
+                return False
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()
+        _registrar_falha(conn, job, str(e))
+        return False
+
+
+def _registrar_falha(conn, job, erro):
+    with conn.cursor() as cursor:
+        if job['tentativas'] >= job['max_tentativas']:
+            cursor.execute('''
+                UPDATE jobs SET status = 'Falhou', erro = %s, finalizado_em = CURRENT_TIMESTAMP
+                WHERE job_id = %s AND status = 'Executando' AND iniciado_em = %s
+            ''', (erro, job['job_id'], job['iniciado_em']))
+        else:
+            espera = BACKOFF_BASE * (2 ** (job['tentativas'] - 1))
+            cursor.execute('''
+                UPDATE jobs SET status = 'Pendente', erro = %s,
+                                executar_em = CURRENT_TIMESTAMP + %s * INTERVAL '1 second'
+                WHERE job_id = %s AND status = 'Executando' AND iniciado_em = %s
+            ''', (erro, espera, job['job_id'], job['iniciado_em']))
+    conn.commit()
+
+
+def recuperar_orfaos(conn):
+    """Devolve à fila tarefas em 'Executando' cujo worker parou de mandar heartbeat."""
+    with conn.cursor() as cursor:
+        cursor.execute('''
+            UPDATE jobs SET status = CASE WHEN tentativas >= max_tentativas THEN 'Falhou' ELSE 'Pendente' END,
+                            erro = 'Tempo de execução excedido.'
+            WHERE status = 'Executando'
+              AND COALESCE(heartbeat_em, iniciado_em) < CURRENT_TIMESTAMP - %s * INTERVAL '1 second'
+        ''', (TIMEOUT_EXECUCAO,))
+        n = cursor.rowcount
+    conn.commit()
+    return n
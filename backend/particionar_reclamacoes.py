@@ -0,0 +1,144 @@
+"""
+Particionamento e arquivamento da tabela Complaints.
+
+Layout depois da migração:
+    complaints                        PARTITION BY LIST (arquivada)
+    ├── complaints_ativas             arquivada = FALSE  (partição "quente")
+    └── complaints_arquivo            arquivada = TRUE, PARTITION BY RANGE (created_at)
+        ├── complaints_arquivo_2024   um ano por partição, criadas sob demanda
+        ├── ...
+        └── complaints_arquivo_default
+
+A listagem padrão filtra `arquivada = FALSE`, então o planner só lê a
+partição quente. O arquivamento marca `arquivada = TRUE` nas reclamações
+resolvidas mais antigas que N dias, o que move as linhas para o arquivo.
+
+Uso:
+    python particionar_reclamacoes.py migrar
+    python particionar_reclamacoes.py arquivar [dias]
+"""
+import os
+import sys
+
+import psycopg2
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+DB_SSLMODE = os.environ.get('DB_SSLMODE', 'require')
+# Idade mínima (dias desde a criação) para uma reclamação resolvida ir para o arquivo
+ARQUIVO_DIAS = int(os.environ.get('ARQUIVO_DIAS', 365))
+STATUS_RESOLVIDO = 'Resolvido'
+
+
+def ja_particionada(cursor):
+    cursor.execute('''
+        SELECT 1 FROM pg_partitioned_table p
+        JOIN pg_class c ON p.partrelid = c.oid
+        WHERE c.relname = 'complaints' AND c.relnamespace = to_regnamespace(current_schema())
+    ''')
+    return cursor.fetchone() is not None
+
+
+def migrar(cursor):
+    """Converte a tabela complaints existente para o layout particionado."""
+    if ja_particionada(cursor):
+        return False
+
+    cursor.execute('LOCK TABLE complaints IN ACCESS EXCLUSIVE MODE')
+    cursor.execute('ALTER TABLE complaints RENAME TO complaints_legado')
+    cursor.execute('''
+        CREATE TABLE complaints (
+            LIKE complaints_legado INCLUDING DEFAULTS,
+            arquivada BOOLEAN NOT NULL DEFAULT FALSE
+        ) PARTITION BY LIST (arquivada)
+    ''')
+    cursor.execute('UPDATE complaints_legado SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL')
+    cursor.execute('ALTER TABLE complaints ALTER COLUMN created_at SET NOT NULL')
+    cursor.execute('ALTER TABLE complaints ADD PRIMARY KEY (id, arquivada, created_at)')
+
+    # LIKE não copia FKs nem CHECKs (ex.: user_id -> moradores, apartamento_id -> apartamentos)
+    cursor.execute('''
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = 'complaints_legado'::regclass AND contype IN ('f', 'c')
+        ORDER BY conname
+    ''')
+    for nome, definicao in cursor.fetchall():
+        cursor.execute(f'ALTER TABLE complaints ADD CONSTRAINT "{nome}" {definicao}')
+
+    cursor.execute('CREATE TABLE complaints_ativas PARTITION OF complaints FOR VALUES IN (FALSE)')
+    cursor.execute('''
+        CREATE TABLE complaints_arquivo PARTITION OF complaints
+        FOR VALUES IN (TRUE) PARTITION BY RANGE (created_at)
+    ''')
+    cursor.execute('CREATE TABLE complaints_arquivo_default PARTITION OF complaints_arquivo DEFAULT')
+    cursor.execute('CREATE INDEX idx_complaints_user ON complaints (user_id)')
+
+    cursor.execute('INSERT INTO complaints SELECT *, FALSE FROM complaints_legado')
+
+    # A sequence do SERIAL pertence à tabela antiga; sem isso o DROP a levaria junto
+    cursor.execute("SELECT pg_get_serial_sequence('complaints_legado', 'id') AS seq")
+    seq = cursor.fetchone()[0]
+    if seq:
+        cursor.execute(f'ALTER SEQUENCE {seq} OWNED BY complaints.id')
+    cursor.execute('DROP TABLE complaints_legado')
+    return True
+
+
+def _garantir_particoes(cursor, anos):
+    for ano in anos:
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS complaints_arquivo_{ano:d} PARTITION OF complaints_arquivo
+            FOR VALUES FROM ('{ano:d}-01-01') TO ('{ano + 1:d}-01-01')
+        ''')
+
+
+def arquivar(cursor, dias=ARQUIVO_DIAS):
+    """Move reclamações resolvidas com mais de `dias` dias para as partições frias."""
+    cursor.execute('''
+        SELECT DISTINCT EXTRACT(YEAR FROM created_at)::int AS ano FROM complaints_ativas
+        WHERE status = %s AND created_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 day'
+    ''', (STATUS_RESOLVIDO, dias))
+    _garantir_particoes(cursor, [row[0] for row in cursor.fetchall()])
+
+    cursor.execute('''
+        UPDATE complaints SET arquivada = TRUE
+        WHERE arquivada = FALSE AND status = %s
+          AND created_at < CURRENT_TIMESTAMP - %s * INTERVAL '1 day'
+    ''', (STATUS_RESOLVIDO, dias))
+    return cursor.rowcount
+
+
+def main():
+    if not DATABASE_URL:
+        print("Erro: Variável de ambiente DATABASE_URL não foi definida.")
+        return
+
+    comando = sys.argv[1] if len(sys.argv) > 1 else ''
+    if comando not in ('migrar', 'arquivar'):
+        print(__doc__)
+        return
+
+    conn = None
+    try:
+        conn = psycopg2.connect(DATABASE_URL, sslmode=DB_SSLMODE)
+        with conn.cursor() as cursor:
+            if comando == 'migrar':
+                if migrar(cursor):
+                    print("Tabela complaints particionada com sucesso.")
+                else:
+                    print("A tabela complaints já está particionada. Nada a fazer.")
+            else:
+                dias = int(sys.argv[2]) if len(sys.argv) > 2 else ARQUIVO_DIAS
+                n = arquivar(cursor, dias)
+                print(f"{n} reclamação(ões) movida(s) para o arquivo.")
+        conn.commit()
+    except psycopg2.Error as e:
+        print(f"Erro no banco de dados: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Controle de admissão (token bucket) para as rotas de autenticação.
+
+Login, cadastro e troca de senha calculam um hash de senha, que é caro em CPU.
+Cada requisição consome um token do balde do IP do cliente e outro do balde
+da identidade (e-mail ou morador_id). Quando um balde esvazia, a rota responde
+429 com Retry-After sem tocar no banco nem calcular hash.
+
+Os contadores ficam num arquivo SQLite local, compartilhado por todos os
+workers do gunicorn da mesma máquina.
+"""
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from functools import wraps
+
+from flask import request, jsonify
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+# Quantos proxies confiáveis (load balancer, CDN) ficam na frente da app.
+# 0 = ignora X-Forwarded-For e usa o IP da conexão.
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+RATE_LIMIT_DB = os.environ.get(
+    'RATE_LIMIT_DB', os.path.join(tempfile.gettempdir(), 'condominio_rate_limit.db')
+)
+
+# (capacidade do balde, tokens repostos por minuto)
+LIMITES = {
+    'ip': (
+        int(os.environ.get('RATE_LIMIT_IP_BURST', 20)),
+        float(os.environ.get('RATE_LIMIT_IP_PER_MIN', 30)),
+    ),
+    'identidade': (
+        int(os.environ.get('RATE_LIMIT_ID_BURST', 5)),
+        float(os.environ.get('RATE_LIMIT_ID_PER_MIN', 5)),
+    ),
+}
+
+# Baldes parados há mais tempo que isso são removidos na limpeza periódica
+_EXPIRACAO_BALDE = 3600
+_schema_pronto = False
+
+
+def _get_store():
+    global _schema_pronto
+    conn = sqlite3.connect(RATE_LIMIT_DB, timeout=2, isolation_level=None)
+    if not _schema_pronto:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS buckets (
+                chave TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                atualizado_em REAL NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS metricas (
+                nome TEXT PRIMARY KEY,
+                valor INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        _schema_pronto = True
+    return conn
+
+
+def _consumir(conn, chave, capacidade, por_minuto, agora):
+    """Tenta retirar 1 token do balde. Retorna 0 se liberado, senão os segundos até o próximo token."""
+    taxa = por_minuto / 60.0
+    row = conn.execute('SELECT tokens, atualizado_em FROM buckets WHERE chave = ?', (chave,)).fetchone()
+    if row:
+        tokens = min(capacidade, row[0] + (agora - row[1]) * taxa)
+    else:
+        tokens = float(capacidade)
+
+    if tokens >= 1:
+        espera = 0
+        tokens -= 1
+    else:
+        espera = math.ceil((1 - tokens) / taxa) if taxa > 0 else _EXPIRACAO_BALDE
+
+    conn.execute(
+        'INSERT OR REPLACE INTO buckets (chave, tokens, atualizado_em) VALUES (?, ?, ?)',
+        (chave, tokens, agora)
+    )
+    return espera
+
+
+def _incrementar(conn, nome):
+    conn.execute(
+        'INSERT INTO metricas (nome, valor) VALUES (?, 1) '
+        'ON CONFLICT(nome) DO UPDATE SET valor = valor + 1',
+        (nome,)
+    )
+
+
+def verificar(endpoint, chaves):
+    """
+    Consome um token de cada balde em `chaves` ([(tipo, valor), ...]).
+    Retorna (liberado, retry_after). Falhas no armazenamento liberam a requisição.
+    """
+    agora = time.time()
+    conn = None
+    try:
+        conn = _get_store()
+        conn.execute('BEGIN IMMEDIATE')
+        espera, bloqueado_por = 0, None
+        for tipo, valor in chaves:
+            capacidade, por_minuto = LIMITES[tipo]
+            espera = _consumir(conn, f'{endpoint}:{tipo}:{valor}', capacidade, por_minuto, agora)
+            if espera:
+                bloqueado_por = tipo
+                break
+
+        if bloqueado_por:
+            _incrementar(conn, f'rate_limit_blocked_total{{endpoint="{endpoint}",chave="{bloqueado_por}"}}')
+        else:
+            _incrementar(conn, f'rate_limit_allowed_total{{endpoint="{endpoint}"}}')
+
+        # Limpeza ocasional dos baldes abandonados
+        if random.random() < 0.01:
+            conn.execute('DELETE FROM buckets WHERE atualizado_em < ?', (agora - _EXPIRACAO_BALDE,))
+
+        conn.execute('COMMIT')
+        return bloqueado_por is None, espera
+    except sqlite3.Error:
+        if conn and conn.in_transaction:
+            conn.execute('ROLLBACK')
+        return True, 0
+    finally:
+        if conn: conn.close()
+
+
+def client_ip():
+    # X-Forwarded-For só é considerado via ProxyFix (TRUSTED_PROXY_HOPS em App.py);
+    # lê-lo direto deixaria o cliente escolher o próprio IP e fugir do limite
+    return request.remote_addr or 'desconhecido'
+
+
+def limitar(endpoint):
+    """Decorator que aplica os limites de IP e de identidade a uma rota."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED:
+                return view(*args, **kwargs)
+
+            chaves = [('ip', client_ip())]
+            data = request.get_json(silent=True) or {}
+            email = data.get('email')
+            if email:
+                chaves.append(('identidade', str(email).strip().lower()))
+            elif 'morador_id' in kwargs:
+                chaves.append(('identidade', f"morador:{kwargs['morador_id']}"))
+
+            liberado, espera = verificar(endpoint, chaves)
+            if not liberado:
+                resp = jsonify({'error': 'Muitas tentativas. Tente novamente mais tarde.'})
+                resp.headers['Retry-After'] = str(espera)
+                return resp, 429
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def metricas_texto():
+    """Contadores no formato texto do Prometheus."""
+    conn = None
+    try:
+        conn = _get_store()
+        rows = conn.execute('SELECT nome, valor FROM metricas ORDER BY nome').fetchall()
+    except sqlite3.Error:
+        rows = []
+    finally:
+        if conn: conn.close()
+
+    linhas = [
+        '# TYPE rate_limit_allowed_total counter',
+        '# TYPE rate_limit_blocked_total counter',
+    ]
+    linhas += [f'{nome} {valor}' for nome, valor in rows]
+    return '\n'.join(linhas) + '\n'
@@ -0,0 +1,163 @@
+"""
+Roteamento de leituras para uma réplica do PostgreSQL (opcional).
+
+Só é ativado quando READ_DATABASE_URL está definida. Rotas GET pedem uma
+conexão de leitura; ela vai para a réplica a não ser que:
+  - a réplica esteja fora do ar ou com atraso acima de REPLICA_MAX_LAG segundos;
+  - o mesmo cliente tenha feito uma escrita há menos de REPLICA_STICKY_SECONDS
+    (para que ele sempre veja o que acabou de gravar).
+Nesses casos a leitura cai no primário.
+
+As conexões com a réplica vêm de um pool por tenant (tenants.conectar_replica),
+com o search_path definido uma vez por conexão, como no primário.
+
+As escritas recentes ficam num SQLite local para valer entre todos os
+workers do gunicorn.
+
+Teste local com duas instâncias em streaming replication:
+    initdb -D /tmp/pg1 && pg_ctl -D /tmp/pg1 -o "-p 5432" start
+    pg_basebackup -h localhost -p 5432 -D /tmp/pg2 -R
+    pg_ctl -D /tmp/pg2 -o "-p 5433" start
+    export DB_SSLMODE=disable
+    export DATABASE_URL=postgresql://localhost:5432/postgres
+    export READ_DATABASE_URL=postgresql://localhost:5433/postgres
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import psycopg2
+
+import tenants
+
+READ_DATABASE_URL = os.environ.get('READ_DATABASE_URL')
+REPLICA_MAX_LAG = float(os.environ.get('REPLICA_MAX_LAG', 5))
+REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL', 5))
+REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 15))
+REPLICA_CONNECT_TIMEOUT = int(os.environ.get('REPLICA_CONNECT_TIMEOUT', 2))
+# Depois de uma falha de conexão, a réplica fica fora da rotação por esse tempo
+REPLICA_RETRY_SECONDS = float(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+REPLICA_STICKY_DB = os.environ.get(
+    'REPLICA_STICKY_DB', os.path.join(tempfile.gettempdir(), 'condominio_replica.db')
+)
+
+_lock = threading.Lock()
+_estado = {'lag': None, 'verificado_em': 0.0, 'indisponivel_ate': 0.0}
+_schema_pronto = False
+
+# NULL = atraso desconhecido (réplica sem walreceiver ativo, ou seja, desconectada do
+# primário: receive_lsn = replay_lsn para sempre e os dados ficam velhos sem aviso).
+# Sem pg_read_all_stats o status vem NULL, mas a linha só existe se o walreceiver roda.
+LAG_QUERY = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (
+            SELECT 1 FROM pg_stat_wal_receiver
+            WHERE pid IS NOT NULL AND COALESCE(status, 'streaming') = 'streaming'
+        ) THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag
+'''
+
+
+def _get_store():
+    global _schema_pronto
+    conn = sqlite3.connect(REPLICA_STICKY_DB, timeout=1, isolation_level=None)
+    if not _schema_pronto:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS escritas (cliente TEXT PRIMARY KEY, em REAL NOT NULL)')
+        _schema_pronto = True
+    return conn
+
+
+def marcar_escrita(cliente):
+    """Registra que `cliente` acabou de gravar; suas leituras vão ao primário por um tempo."""
+    if not READ_DATABASE_URL:
+        return
+    conn = None
+    try:
+        conn = _get_store()
+        conn.execute('INSERT OR REPLACE INTO escritas (cliente, em) VALUES (?, ?)', (cliente, time.time()))
+    except sqlite3.Error:
+        pass
+    finally:
+        if conn: conn.close()
+
+
+def _escreveu_recentemente(cliente):
+    conn = None
+    try:
+        conn = _get_store()
+        row = conn.execute('SELECT em FROM escritas WHERE cliente = ?', (cliente,)).fetchone()
+        return bool(row) and time.time() - row[0] < REPLICA_STICKY_SECONDS
+    except sqlite3.Error:
+        # Sem como saber: na dúvida, primário
+        return True
+    finally:
+        if conn: conn.close()
+
+
+def _lag_em_cache():
+    """True/False se houver medição recente do atraso; None se for preciso medir de novo."""
+    with _lock:
+        if time.time() - _estado['verificado_em'] < REPLICA_LAG_CHECK_INTERVAL:
+            return _estado['lag'] is not None and _estado['lag'] <= REPLICA_MAX_LAG
+    return None
+
+
+def _medir_lag(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(LAG_QUERY)
+        lag = cursor.fetchone()['lag']
+    conn.rollback()
+
+    lag = float(lag) if lag is not None else None
+    with _lock:
+        _estado['lag'] = lag
+        _estado['verificado_em'] = time.time()
+    return lag is not None and lag <= REPLICA_MAX_LAG
+
+
+def conectar_leitura(tenant, cliente):
+    """Retorna uma conexão (do pool do tenant) com a réplica, ou None se a leitura deve ir ao primário."""
+    if not READ_DATABASE_URL:
+        return None
+    with _lock:
+        if time.time() < _estado['indisponivel_ate']:
+            return None
+    # Atraso sabidamente alto: nem abre conexão com a réplica
+    lag_ok = _lag_em_cache()
+    if lag_ok is False:
+        return None
+    if _escreveu_recentemente(cliente):
+        return None
+
+    conn = None
+    try:
+        conn = tenants.conectar_replica(tenant, READ_DATABASE_URL, REPLICA_CONNECT_TIMEOUT)
+        if lag_ok or _medir_lag(conn):
+            return conn
+        conn.close()
+        return None
+    except tenants.SchemaNaoProvisionado:
+        # Não é problema da réplica: o primário recusa a requisição
+        return None
+    except psycopg2.Error:
+        if conn: conn.close()
+        with _lock:
+            _estado['indisponivel_ate'] = time.time() + REPLICA_RETRY_SECONDS
+            _estado['lag'] = None
+            _estado['verificado_em'] = 0.0
+        return None
+
+
+def status():
+    with _lock:
+        return {
+            'configurada': bool(READ_DATABASE_URL),
+            'lag': _estado['lag'],
+            'disponivel': time.time() >= _estado['indisponivel_ate'],
+        }
@@ -2,96 +2,158 @@
 Script para setup e população inicial do banco de dados PostgreSQL do condomínio.
 """
 import os
+import sys
 import psycopg2
 from psycopg2 import sql
 from werkzeug.security import generate_password_hash
 
+import particionar_reclamacoes
+import tenants
+
 # 1. Primeiro pegamos a URL do ambiente
 DATABASE_URL = os.environ.get('DATABASE_URL')
+DB_SSLMODE = os.environ.get('DB_SSLMODE', 'require')
+
+
+def criar_tabelas(cursor):
+    """Cria as tabelas (se não existirem) no schema atual do search_path."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Blocos (
+            bloco_id SERIAL PRIMARY KEY,
+            numero_bloco INTEGER NOT NULL UNIQUE
+        );
+
+        CREATE TABLE IF NOT EXISTS Apartamentos (
+            apartamento_id SERIAL PRIMARY KEY,
+            numero_apartamento INTEGER NOT NULL,
+            bloco_id INTEGER NOT NULL REFERENCES Blocos(bloco_id),
+            UNIQUE(bloco_id, numero_apartamento)
+        );
+
+        CREATE TABLE IF NOT EXISTS Moradores (
+            morador_id SERIAL PRIMARY KEY,
+            nome VARCHAR(100) NOT NULL,
+            email VARCHAR(100) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            role VARCHAR(20) DEFAULT 'morador',
+            apartamento_id INTEGER REFERENCES Apartamentos(apartamento_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS Morador_Apartamentos (
+            morador_id INTEGER NOT NULL REFERENCES Moradores(morador_id),
+            apartamento_id INTEGER NOT NULL REFERENCES Apartamentos(apartamento_id),
+            PRIMARY KEY (morador_id, apartamento_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS Apartment_Requests (
+            request_id SERIAL PRIMARY KEY,
+            morador_id INTEGER NOT NULL REFERENCES Moradores(morador_id),
+            apartamento_id INTEGER NOT NULL REFERENCES Apartamentos(apartamento_id),
+            status VARCHAR(20) NOT NULL DEFAULT 'Pendente',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        CREATE TABLE IF NOT EXISTS Complaints (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER REFERENCES Moradores(morador_id),
+            apartamento_id INTEGER REFERENCES Apartamentos(apartamento_id),
+            subject VARCHAR(100) NOT NULL,
+            description TEXT NOT NULL,
+            status VARCHAR(20) DEFAULT 'Aberto',
+            admin_comment TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Fila de tarefas em segundo plano (jobs.py / worker.py)
+        CREATE TABLE IF NOT EXISTS Jobs (
+            job_id SERIAL PRIMARY KEY,
+            tipo VARCHAR(50) NOT NULL,
+            payload JSONB NOT NULL DEFAULT '{}',
+            status VARCHAR(20) NOT NULL DEFAULT 'Pendente',
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            max_tentativas INTEGER NOT NULL DEFAULT 5,
+            executar_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            resultado JSONB,
+            erro TEXT,
+            criado_por INTEGER REFERENCES Moradores(morador_id) ON DELETE SET NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            iniciado_em TIMESTAMP,
+            heartbeat_em TIMESTAMP,
+            finalizado_em TIMESTAMP
+        );
+        ALTER TABLE Jobs ADD COLUMN IF NOT EXISTS heartbeat_em TIMESTAMP;
+
+        CREATE INDEX IF NOT EXISTS idx_jobs_fila ON Jobs (executar_em) WHERE status = 'Pendente';
+    """)
+
+    # Complaints particionada em ativas/arquivo (ver particionar_reclamacoes.py)
+    particionar_reclamacoes.migrar(cursor)
 
-def setup_database():
-    """Cria tabelas (se não existirem) e popula dados iniciais."""
-    if not DATABASE_URL:
+
+def popular_dados(cursor):
+    """Blocos, apartamentos e o síndico inicial. Não faz nada se já houver blocos."""
+    cursor.execute("SELECT COUNT(*) FROM Blocos")
+    if cursor.fetchone()[0] > 0:
+        print("O banco de dados já possui dados. Pulando população.")
+        return False
+
+    print("Populando dados iniciais...")
+    # Bloco 0 para o Síndico Geral
+    cursor.execute("INSERT INTO Blocos (numero_bloco) VALUES (0) RETURNING bloco_id")
+    bloco_0_id = cursor.fetchone()[0]
+
+    cursor.execute("INSERT INTO Apartamentos (numero_apartamento, bloco_id) VALUES (0, %s) RETURNING apartamento_id", (bloco_0_id,))
+    ap_0_id = cursor.fetchone()[0]
+
+    # Criar Síndico
+    senha_hash = generate_password_hash("admin123")
+    cursor.execute("""
+        INSERT INTO Moradores (nome, email, password, role, apartamento_id) 
+        VALUES ('Síndico Geral', 'admin@condominio.com', %s, 'sindico', %s) RETURNING morador_id
+    """, (senha_hash, ap_0_id))
+    sindico_id = cursor.fetchone()[0]
+    cursor.execute("INSERT INTO Morador_Apartamentos (morador_id, apartamento_id) VALUES (%s, %s)", (sindico_id, ap_0_id))
+
+    # Criar outros blocos (1 a 40)
+    for b in range(1, 41):
+        cursor.execute("INSERT INTO Blocos (numero_bloco) VALUES (%s) RETURNING bloco_id", (b,))
+        bloco_id = cursor.fetchone()[0]
+        # Criar apartamentos para cada bloco
+        for andar in range(1, 13):
+            for ap_final in range(1, 7):
+                num_ap = int(f"{andar}{ap_final}")
+                cursor.execute("INSERT INTO Apartamentos (numero_apartamento, bloco_id) VALUES (%s, %s)", (num_ap, bloco_id))
+
+    print("Dados iniciais inseridos com sucesso.")
+    return True
+
+
+def setup_database(tenant=None):
+    """
+    Cria tabelas e popula dados iniciais. Com `tenant`, provisiona o schema
+    (e o banco, se configurado) daquele condomínio (ver tenants.py).
+    """
+    dsn, schema = tenants.parametros_conexao(tenant) if tenant else (DATABASE_URL, None)
+    if not dsn:
         print("Erro: Variável de ambiente DATABASE_URL não foi definida.")
         return
 
     conn = None
     try:
         # 2. Conectamos usando SSL (obrigatório para Supabase)
-        conn = psycopg2.connect(DATABASE_URL, sslmode='require')
-        
+        conn = psycopg2.connect(dsn, sslmode=DB_SSLMODE)
+
         with conn.cursor() as cursor:
+            if schema:
+                print(f"Provisionando o condomínio '{tenant}' no schema '{schema}'...")
+                cursor.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(schema)))
+                cursor.execute(sql.SQL("SET search_path TO {}").format(sql.Identifier(schema)))
+
             print("Verificando e criando tabelas (se não existirem)...")
-           
-            # 3. SQL corrigido com aspas triplas
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS Blocos (
-                    bloco_id SERIAL PRIMARY KEY,
-                    numero_bloco INTEGER NOT NULL UNIQUE
-                );
-                
-                CREATE TABLE IF NOT EXISTS Apartamentos (
-                    apartamento_id SERIAL PRIMARY KEY,
-                    numero_apartamento INTEGER NOT NULL,
-                    bloco_id INTEGER NOT NULL REFERENCES Blocos(bloco_id),
-                    UNIQUE(bloco_id, numero_apartamento)
-                );
-                
-                CREATE TABLE IF NOT EXISTS Moradores (
-                    morador_id SERIAL PRIMARY KEY,
-                    nome VARCHAR(100) NOT NULL,
-                    email VARCHAR(100) UNIQUE NOT NULL,
-                    password VARCHAR(255) NOT NULL,
-                    role VARCHAR(20) DEFAULT 'morador',
-                    apartamento_id INTEGER REFERENCES Apartamentos(apartamento_id)
-                );
-                
-                CREATE TABLE IF NOT EXISTS Complaints (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER REFERENCES Moradores(morador_id),
-                    subject VARCHAR(100) NOT NULL,
-                    description TEXT NOT NULL,
-                    status VARCHAR(20) DEFAULT 'Aberto',
-                    admin_comment TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-
-            # Verifica se o banco já tem dados
-            cursor.execute("SELECT COUNT(*) FROM Blocos")
-            count = cursor.fetchone()[0]
-
-            if count == 0:
-                print("Populando dados iniciais...")
-                # Bloco 0 para o Síndico Geral
-                cursor.execute("INSERT INTO Blocos (numero_bloco) VALUES (0) RETURNING bloco_id")
-                bloco_0_id = cursor.fetchone()[0]
-                
-                cursor.execute("INSERT INTO Apartamentos (numero_apartamento, bloco_id) VALUES (0, %s) RETURNING apartamento_id", (bloco_0_id,))
-                ap_0_id = cursor.fetchone()[0]
-
-                # Criar Síndico
-                senha_hash = generate_password_hash("admin123")
-                cursor.execute("""
-                    INSERT INTO Moradores (nome, email, password, role, apartamento_id) 
-                    VALUES ('Síndico Geral', 'admin@condominio.com', %s, 'sindico', %s)
-                """, (senha_hash, ap_0_id))
-
-                # Criar outros blocos (1 a 40)
-                for b in range(1, 41):
-                    cursor.execute("INSERT INTO Blocos (numero_bloco) VALUES (%s) RETURNING bloco_id", (b,))
-                    bloco_id = cursor.fetchone()[0]
-                    # Criar apartamentos para cada bloco
-                    for andar in range(1, 13):
-                        for ap_final in range(1, 7):
-                            num_ap = int(f"{andar}{ap_final}")
-                            cursor.execute("INSERT INTO Apartamentos (numero_apartamento, bloco_id) VALUES (%s, %s)", (num_ap, bloco_id))
-                
-                print("Dados iniciais inseridos com sucesso.")
-            else:
-                print("O banco de dados já possui dados. Pulando população.")
-
-            conn.commit() 
+            criar_tabelas(cursor)
+            popular_dados(cursor)
+
+            conn.commit()
 
     except psycopg2.Error as e:
         print(f"Erro no banco de dados: {e}")
@@ -103,4 +165,6 @@ def setup_database():
             print("Conexão fechada.")
 
 if __name__ == '__main__':
-    setup_database()
\ No newline at end of file
+    # python setup_database.py            -> banco padrão (DATABASE_URL)
+    # python setup_database.py <tenant>   -> provisiona um condomínio de TENANTS
+    setup_database(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,226 @@
+"""
+Vários condomínios (tenants) servidos pela mesma instalação.
+
+Cada tenant tem seus dados num schema próprio do PostgreSQL e, se quiser,
+num banco próprio. A configuração vem de TENANTS (JSON) ou TENANTS_FILE:
+
+    {
+      "jardins": {"schema": "jardins", "hosts": ["jardins.condominio.app"]},
+      "acacias": {"schema": "acacias"},
+      "palmeiras": {"dsn": "postgresql://.../palmeiras", "schema": "public"}
+    }
+
+Sem TENANTS, tudo continua como antes: um único tenant 'default' no
+DATABASE_URL, schema public.
+
+O tenant de cada requisição vem do Host (lista "hosts" ou o primeiro
+rótulo do subdomínio), depois de TENANT_PADRAO. O cabeçalho X-Tenant só é
+usado quando chega de um proxy listado em TENANT_HEADER_PROXIES; de
+qualquer outra origem ele é ignorado, para que um cliente não escolha o
+condomínio só mandando o cabeçalho.
+Cada tenant tem seu próprio pool de conexões por worker, limitado a
+TENANT_POOL_MAX, para que um condomínio sozinho não esgote o banco.
+"""
+import json
+import os
+import re
+import threading
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extras import RealDictCursor
+
+DATABASE_URL = os.environ.get('DATABASE_URL')
+DB_SSLMODE = os.environ.get('DB_SSLMODE', 'require')
+# Conexões ociosas mantidas / máximo em uso, por tenant e por worker
+TENANT_POOL_MIN = int(os.environ.get('TENANT_POOL_MIN', 2))
+TENANT_POOL_MAX = int(os.environ.get('TENANT_POOL_MAX', 10))
+TENANT_PADRAO = os.environ.get('TENANT_PADRAO')
+# IPs (conexão direta) dos proxies que podem escolher o tenant via X-Tenant
+TENANT_HEADER_PROXIES = {ip.strip() for ip in os.environ.get('TENANT_HEADER_PROXIES', '').split(',') if ip.strip()}
+
+SLUG_VALIDO = re.compile(r'^[a-z][a-z0-9_]{0,40}$')
+
+
+class TenantNaoEncontrado(Exception):
+    pass
+
+
+class SchemaNaoProvisionado(Exception):
+    pass
+
+
+def _carregar():
+    bruto = os.environ.get('TENANTS')
+    if not bruto and os.environ.get('TENANTS_FILE'):
+        with open(os.environ['TENANTS_FILE'], encoding='utf-8') as f:
+            bruto = f.read()
+    if not bruto:
+        return {'default': {'dsn': DATABASE_URL, 'schema': 'public', 'hosts': []}}
+
+    tenants = {}
+    for slug, cfg in json.loads(bruto).items():
+        if not SLUG_VALIDO.match(slug):
+            raise ValueError(f"Identificador de tenant inválido: {slug!r}")
+        tenants[slug] = {
+            'dsn': cfg.get('dsn') or DATABASE_URL,
+            'schema': cfg.get('schema') or slug,
+            'hosts': [h.lower() for h in cfg.get('hosts', [])],
+        }
+    return tenants
+
+
+TENANTS = _carregar()
+_HOSTS = {host: slug for slug, cfg in TENANTS.items() for host in cfg['hosts']}
+
+
+def listar():
+    return list(TENANTS)
+
+
+def config(slug):
+    try:
+        return TENANTS[slug]
+    except KeyError:
+        raise TenantNaoEncontrado(slug)
+
+
+def usa_banco_padrao(slug):
+    """True se o tenant mora no DATABASE_URL (e portanto pode ler da réplica)."""
+    return config(slug)['dsn'] == DATABASE_URL
+
+
+def resolver(headers, host, origem=None):
+    """
+    Descobre o tenant da requisição. Levanta TenantNaoEncontrado se não houver.
+    `origem` é o IP da conexão direta (antes do ProxyFix).
+    """
+    if len(TENANTS) == 1:
+        return next(iter(TENANTS))
+
+    slug = ''
+    if origem in TENANT_HEADER_PROXIES:
+        slug = (headers.get('X-Tenant') or '').strip().lower()
+    if not slug:
+        host = (host or '').split(':')[0].lower()
+        slug = _HOSTS.get(host) or host.split('.')[0]
+    if slug in TENANTS:
+        return slug
+    if TENANT_PADRAO in TENANTS:
+        return TENANT_PADRAO
+    raise TenantNaoEncontrado(slug)
+
+
+def definir_schema(conn, schema):
+    """
+    Põe o search_path só no schema do tenant. Sem `public` no caminho, um
+    condomínio ainda não provisionado não lê nem grava nas tabelas de outro:
+    a conexão é recusada com SchemaNaoProvisionado.
+    """
+    with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cursor:
+        cursor.execute(sql.SQL('SET search_path TO {}').format(sql.Identifier(schema)))
+        cursor.execute("SELECT to_regclass('moradores') IS NOT NULL")
+        provisionado = cursor.fetchone()[0]
+    conn.commit()
+    if not provisionado:
+        raise SchemaNaoProvisionado(schema)
+
+
+# --- POOLS ---
+
+class ConexaoPool(psycopg2.extensions.connection):
+    """Conexão cujo close() devolve ao pool em vez de fechar de verdade."""
+    pool = None
+    schema = None
+
+    def close(self):
+        pool, self.pool = self.pool, None
+        if pool is None or self.closed:
+            return super().close()
+        pool.putconn(self)
+
+
+_pools = {}
+_travas = {}
+_pools_pid = None
+_lock = threading.Lock()
+
+
+def _get_pool(chave, dsn, connect_timeout):
+    global _pools, _travas, _pools_pid
+    with _lock:
+        # Pools não podem ser herdados pelo fork dos workers do gunicorn
+        if _pools_pid != os.getpid():
+            _pools, _travas, _pools_pid = {}, {}, os.getpid()
+        if chave in _pools:
+            return _pools[chave]
+        trava = _travas.setdefault(chave, threading.Lock())
+
+    # O pool abre TENANT_POOL_MIN conexões ao nascer: isso fica fora do _lock
+    # para que um banco fora do ar não segure o checkout dos outros tenants
+    with trava:
+        with _lock:
+            pool = _pools.get(chave)
+        if pool is None:
+            pool = ThreadedConnectionPool(
+                TENANT_POOL_MIN, TENANT_POOL_MAX, dsn,
+                connection_factory=ConexaoPool, cursor_factory=RealDictCursor,
+                sslmode=DB_SSLMODE, connect_timeout=connect_timeout
+            )
+            with _lock:
+                _pools[chave] = pool
+    return pool
+
+
+def _viva(conn):
+    """Ping barato: o banco pode ter reiniciado ou derrubado a conexão ociosa."""
+    if conn.closed:
+        return False
+    try:
+        # Em autocommit o SELECT não abre transação (uma ida e volta só)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        conn.autocommit = False
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _conectar_pool(chave, dsn, schema, connect_timeout):
+    pool = _get_pool(chave, dsn, connect_timeout)
+    conn = pool.getconn()
+    # Descarta as conexões mortas; quando acabam as ociosas o pool abre uma nova
+    while not _viva(conn):
+        conn.pool = None
+        pool.putconn(conn, close=True)
+        conn = pool.getconn()
+    conn.pool = pool
+    if conn.schema != schema:
+        try:
+            definir_schema(conn, schema)
+        except (psycopg2.Error, SchemaNaoProvisionado):
+            conn.pool = None
+            pool.putconn(conn, close=True)
+            raise
+        conn.schema = schema
+    return conn
+
+
+def conectar(slug):
+    """Conexão do pool do tenant, já com o search_path no schema dele."""
+    cfg = config(slug)
+    return _conectar_pool(slug, cfg['dsn'], cfg['schema'], 10)
+
+
+def conectar_replica(slug, dsn, connect_timeout):
+    """Como conectar(), mas no pool de leitura do tenant na réplica `dsn` (ver replica.py)."""
+    return _conectar_pool(f'{slug}:replica', dsn, config(slug)['schema'], connect_timeout)
+
+
+def parametros_conexao(slug):
+    """(dsn, schema) para scripts e worker, que abrem conexões próprias."""
+    cfg = config(slug)
+    return cfg['dsn'], cfg['schema']
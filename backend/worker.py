@@ -0,0 +1,90 @@
+"""
+Processo worker da fila de tarefas (ver jobs.py).
+
+Uso:
+    python worker.py
+
+WORKER_THREADS define quantas tarefas este processo executa em paralelo;
+os limites por tipo de tarefa valem para todos os workers juntos (por
+condomínio: cada tenant tem sua própria tabela jobs).
+"""
+import os
+import threading
+import time
+
+import psycopg2
+
+import jobs
+import tenants
+
+WORKER_THREADS = int(os.environ.get('WORKER_THREADS', 2))
+POLL_INTERVAL = float(os.environ.get('WORKER_POLL_INTERVAL', 2))
+
+
+def loop(parar):
+    # Percorre os condomínios em rodízio para que nenhum monopolize o worker
+    conexoes = {}
+    while not parar.is_set():
+        trabalhou = False
+        for tenant in tenants.listar():
+            conn = conexoes.get(tenant)
+            try:
+                if conn is None or conn.closed:
+                    conn = conexoes[tenant] = jobs.get_connection(tenant)
+                job = jobs.reservar(conn)
+                if job is None:
+                    continue
+                trabalhou = True
+                with jobs.batimentos(lambda: jobs.get_connection(tenant), job):
+                    ok = jobs.executar(conn, job)
+                print(f"[{tenant}] Job {job['job_id']} ({job['tipo']}): {'concluído' if ok else 'falhou'}")
+            except tenants.SchemaNaoProvisionado:
+                conexoes.pop(tenant, None)
+            except psycopg2.Error as e:
+                print(f"[{tenant}] Erro no banco de dados: {e}")
+                if conn:
+                    conn.close()
+                conexoes.pop(tenant, None)
+        if not trabalhou:
+            parar.wait(POLL_INTERVAL)
+    for conn in conexoes.values():
+        conn.close()
+
+
+def main():
+    # Cada condomínio precisa de um banco: o próprio dsn ou o DATABASE_URL
+    sem_dsn = [t for t in tenants.listar() if not tenants.config(t)['dsn']]
+    if sem_dsn:
+        raise Exception(f"Sem dsn e sem DATABASE_URL para: {', '.join(sem_dsn)}.")
+
+    parar = threading.Event()
+    threads = [threading.Thread(target=loop, args=(parar,), daemon=True) for _ in range(WORKER_THREADS)]
+    for t in threads:
+        t.start()
+    print(f"Worker iniciado com {WORKER_THREADS} thread(s).")
+
+    try:
+        while True:
+            for tenant in tenants.listar():
+                conn = None
+                try:
+                    conn = jobs.get_connection(tenant)
+                    n = jobs.recuperar_orfaos(conn)
+                    if n:
+                        print(f"[{tenant}] {n} job(s) órfão(s) devolvido(s) à fila.")
+                except tenants.SchemaNaoProvisionado as e:
+                    print(f"[{tenant}] Schema {e} não provisionado (rode setup_database.py {tenant}).")
+                except psycopg2.Error as e:
+                    print(f"[{tenant}] Erro no banco de dados: {e}")
+                finally:
+                    if conn: conn.close()
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print("Encerrando worker...")
+        parar.set()
+        for t in threads:
+            t.join()
+
+
+if __name__ == '__main__':
+    main()